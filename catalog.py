@@ -0,0 +1,264 @@
+import os
+import json
+import asyncio
+
+from similarity import NeighbourIndex
+
+# Если при перезагрузке изменилось не больше стольких способов, индекс похожих способов
+# обновляется точечно, иначе строится заново.
+INCREMENTAL_INDEX_LIMIT = 100
+# Сколько последних версий каталога держать в памяти для начатых опросов.
+# Опрос на более старой версии переходит на текущую.
+KEPT_CATALOG_VERSIONS = 3
+
+
+class CatalogValidationError(ValueError):
+    """Ошибка проверки содержимого factors.json / income_methods.json."""
+
+
+def read_catalog_files(factors_path: str, methods_path: str):
+    """
+    Читает и проверяет JSON-файлы каталога.
+    Возвращает кортеж (factors_data, methods_data) или бросает CatalogValidationError.
+    Функция блокирующая, поэтому из обработчиков бота её нужно вызывать через asyncio.to_thread.
+    """
+    errors = []
+
+    def load(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            errors.append(f"Файл '{path}' не найден.")
+        except json.JSONDecodeError as e:
+            errors.append(f"Некорректный формат JSON-файла '{path}': {e}")
+        return None
+
+    factors_data = load(factors_path)
+    methods_data = load(methods_path)
+    if errors:
+        raise CatalogValidationError("\n".join(errors))
+
+    if not isinstance(factors_data, list) or not factors_data:
+        errors.append("factors.json должен содержать непустой список факторов.")
+        factors_data = []
+    if not isinstance(methods_data, list) or not methods_data:
+        errors.append("income_methods.json должен содержать непустой список способов.")
+        methods_data = []
+
+    factor_ids, factor_names = set(), set()
+    for i, factor in enumerate(factors_data):
+        if not isinstance(factor, dict):
+            errors.append(f"Фактор #{i}: ожидается объект.")
+            continue
+        fid, name, question = factor.get('id'), factor.get('name'), factor.get('question_text')
+        # В множества попадают только значения, прошедшие проверку типа: иначе, например,
+        # "id": [1] упал бы с TypeError (unhashable type) вместо ошибки проверки
+        if not isinstance(fid, int) or isinstance(fid, bool):
+            errors.append(f"Фактор #{i}: поле 'id' должно быть целым числом.")
+        elif fid in factor_ids:
+            errors.append(f"Фактор #{i}: повторяющийся id {fid}.")
+        else:
+            factor_ids.add(fid)
+        if not isinstance(name, str) or not name.strip():
+            errors.append(f"Фактор #{i}: пустое поле 'name'.")
+        elif name in factor_names:
+            errors.append(f"Фактор #{i}: повторяющееся имя '{name}'.")
+        else:
+            factor_names.add(name)
+        if not isinstance(question, str) or not question.strip():
+            errors.append(f"Фактор #{i}: пустое поле 'question_text'.")
+
+    method_ids, method_names = set(), set()
+    for i, method in enumerate(methods_data):
+        if not isinstance(method, dict):
+            errors.append(f"Способ #{i}: ожидается объект.")
+            continue
+        mid, name = method.get('id'), method.get('name')
+        if not isinstance(mid, int) or isinstance(mid, bool):
+            errors.append(f"Способ #{i}: поле 'id' должно быть целым числом.")
+        elif mid in method_ids:
+            errors.append(f"Способ #{i}: повторяющийся id {mid}.")
+        else:
+            method_ids.add(mid)
+        if not isinstance(name, str) or not name.strip():
+            errors.append(f"Способ #{i}: пустое поле 'name'.")
+        elif name in method_names:
+            errors.append(f"Способ #{i}: повторяющееся имя '{name}'.")
+        else:
+            method_names.add(name)
+        if not isinstance(method.get('description'), str):
+            errors.append(f"Способ #{i}: поле 'description' должно быть строкой.")
+
+        scores = method.get('factors')
+        if not isinstance(scores, dict) or not scores:
+            errors.append(f"Способ '{name}': отсутствуют оценки факторов.")
+            continue
+        for factor_name, score in scores.items():
+            if factor_name not in factor_names:
+                errors.append(f"Способ '{name}': неизвестный фактор '{factor_name}'.")
+            if not isinstance(score, int) or isinstance(score, bool) or not 1 <= score <= 10:
+                errors.append(f"Способ '{name}': оценка фактора '{factor_name}' должна быть целым числом от 1 до 10.")
+
+    if errors:
+        raise CatalogValidationError("\n".join(errors))
+    return factors_data, methods_data
+
+
+class Catalog:
+    """
+    Неизменяемый снимок каталога факторов и способов заработка.
+    Опрос запоминает снимок, с которым он начался, и доходит до конца на нём,
+    даже если за это время каталог был перезагружен.
+    """
+
+    def __init__(self, version: int, factors: list, methods: list, similar_count: int = 3,
+                 previous: "Catalog" = None):
+        self.version = version
+        # Тот же формат, что и у DBManager.get_all_factors: [(id, name, question_text), ...]
+        self.factors = [tuple(f) for f in factors]
+        # Тот же формат, что и у DBManager.get_all_methods_with_factors
+        self.methods = methods
+        self.methods_by_id = {m['id']: m for m in methods}
+        self.factor_name_to_id = {name: fid for fid, name, _ in self.factors}
+        self.similar_methods = self._build_similar_methods(similar_count, previous)
+
+    def _build_similar_methods(self, similar_count: int, previous: "Catalog") -> NeighbourIndex:
+        factor_names = tuple(name for _, name, _ in self.factors)
+        if previous is not None:
+            index = previous.similar_methods
+            if index.factor_names == factor_names and index.k == similar_count:
+                removed = previous.methods_by_id.keys() - self.methods_by_id.keys()
+                changed = [
+                    m for m in self.methods
+                    if m['id'] not in previous.methods_by_id
+                    or previous.methods_by_id[m['id']]['factors'] != m['factors']
+                ]
+                if len(removed) + len(changed) <= INCREMENTAL_INDEX_LIMIT:
+                    for method_id in removed:
+                        index = index.without_method(method_id)
+                    for method in changed:
+                        index = index.with_method(method)
+                    return index
+        return NeighbourIndex.build(factor_names, self.methods, similar_count)
+
+    def get_similar_methods(self, method_id: int) -> list:
+        """Похожие способы (словари в формате methods) для способа method_id."""
+        return [self.methods_by_id[i] for i in self.similar_methods.similar(method_id)]
+
+    @classmethod
+    def from_db(cls, db_manager, version: int = 1, similar_count: int = 3) -> "Catalog":
+        factors = db_manager.get_all_factors() or []
+        methods = db_manager.get_all_methods_with_factors()
+        return cls(version, factors, methods, similar_count)
+
+    @classmethod
+    def from_data(cls, factors_data: list, methods_data: list, version: int, similar_count: int = 3,
+                  previous: "Catalog" = None) -> "Catalog":
+        """Строит снимок из проверенных данных read_catalog_files, не обращаясь к БД."""
+        factors = sorted(
+            ((f['id'], f['name'], f['question_text']) for f in factors_data),
+            key=lambda f: f[0]
+        )
+        factor_order = {name: fid for fid, name, _ in factors}
+        methods = []
+        for m in sorted(methods_data, key=lambda m: m['id']):
+            methods.append({
+                'id': m['id'],
+                'name': m['name'],
+                'description': m['description'],
+                'factors': dict(sorted(m['factors'].items(), key=lambda item: factor_order[item[0]]))
+            })
+        return cls(version, factors, methods, similar_count, previous)
+
+
+class CatalogManager:
+    """
+    Хранит текущий снимок каталога и перезагружает его без остановки бота.
+    Проверка JSON и запись в БД выполняются в отдельном потоке, а замена снимка —
+    одним присваиванием ссылки в цикле событий, поэтому обработчики всегда видят
+    либо старый, либо новый каталог целиком.
+    """
+
+    def __init__(self, db_manager, factors_path: str, methods_path: str, similar_count: int = 3):
+        self.db_manager = db_manager
+        self.factors_path = factors_path
+        self.methods_path = methods_path
+        self.similar_count = similar_count
+        self.current = None
+        self._versions = {}  # version -> Catalog, последние KEPT_CATALOG_VERSIONS версий
+        self._lock = asyncio.Lock()
+        self._files_state = None
+
+    def _read_files_state(self):
+        try:
+            return tuple(
+                (os.stat(path).st_mtime_ns, os.stat(path).st_size)
+                for path in (self.factors_path, self.methods_path)
+            )
+        except OSError:
+            return None
+
+    def _set_current(self, catalog: Catalog):
+        self.current = catalog
+        self._versions[catalog.version] = catalog
+        for version in sorted(self._versions)[:-KEPT_CATALOG_VERSIONS]:
+            del self._versions[version]
+
+    def get(self, version) -> Catalog:
+        """Снимок каталога указанной версии, а если он уже вытеснен (или version=None) — текущий."""
+        return self._versions.get(version, self.current)
+
+    def load_initial(self) -> Catalog:
+        """
+        Загружает каталог при старте бота: применяет к БД JSON-файлы (в том числе изменённые,
+        пока бот был остановлен). Если файлы не прошли проверку или запись в БД не удалась,
+        берёт каталог из БД, а файлы оставляет наблюдателю для повторной попытки.
+        """
+        files_state = self._read_files_state()
+        try:
+            self._set_current(self._load_and_apply(1, None))
+            self._files_state = files_state
+        except Exception as e:
+            print(f"Не удалось применить файлы каталога при старте, используется каталог из БД: {e}")
+            self._set_current(Catalog.from_db(self.db_manager, similar_count=self.similar_count))
+            self._files_state = None
+        print(f"Каталог загружен: версия {self.current.version}, "
+              f"факторов {len(self.current.factors)}, способов {len(self.current.methods)}.")
+        return self.current
+
+    def _load_and_apply(self, version: int, previous: Catalog) -> Catalog:
+        factors_data, methods_data = read_catalog_files(self.factors_path, self.methods_path)
+        # Индекс похожих способов строится здесь же, в рабочем потоке
+        new_catalog = Catalog.from_data(factors_data, methods_data, version, self.similar_count, previous)
+        self.db_manager.sync_catalog(factors_data, methods_data)
+        return new_catalog
+
+    async def reload(self) -> Catalog:
+        """
+        Проверяет файлы каталога, применяет их к БД и подменяет текущий снимок.
+        При ошибке проверки или записи текущий каталог остаётся прежним, а исключение пробрасывается.
+        """
+        async with self._lock:
+            files_state = self._read_files_state()
+            version = self.current.version + 1 if self.current else 1
+            new_catalog = await asyncio.to_thread(self._load_and_apply, version, self.current)
+            self._set_current(new_catalog)
+            self._files_state = files_state
+            print(f"Каталог перезагружен: версия {new_catalog.version}, "
+                  f"факторов {len(new_catalog.factors)}, способов {len(new_catalog.methods)}.")
+            return new_catalog
+
+    async def watch(self, interval: float):
+        """Периодически проверяет время изменения JSON-файлов и перезагружает каталог."""
+        while True:
+            await asyncio.sleep(interval)
+            files_state = self._read_files_state()
+            if files_state is None or files_state == self._files_state:
+                continue
+            try:
+                await self.reload()
+            except Exception as e:
+                # Запоминаем состояние файлов, чтобы не повторять ту же ошибку на каждом шаге
+                self._files_state = files_state
+                print(f"Ошибка горячей перезагрузки каталога: {e}")
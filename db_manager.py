@@ -1,28 +1,118 @@
 import os
-import json
+import time
+import threading
+from collections import deque
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 from psycopg2.extensions import connection as PgConnection
 
+# Ключ read-your-writes для записей каталога (факторы и способы)
+CATALOG_WRITE_KEY = "catalog"
+
+# Отставание реплики оцениваем не по времени (now() - pg_last_xact_replay_timestamp() на тихом primary —
+# это время с последней транзакции, а не задержка), и не по pg_last_wal_receive_lsn() (у реплики,
+# потерявшей связь с primary, полученное и применённое WAL совпадают), а по позициям WAL:
+# реплика должна применить всё, что было записано на primary не меньше DB_REPLICA_MAX_LAG секунд назад.
+REPLICA_STATUS_QUERY = "SELECT pg_is_in_recovery(), pg_last_wal_replay_lsn()::text;"
+
+
+def lsn_to_int(lsn: str) -> int:
+    """Переводит позицию WAL вида '16/B374D848' в число, чтобы позиции можно было сравнивать."""
+    high, _, low = lsn.partition("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def parse_replicas(value: str) -> list:
+    """Разбирает строку вида "host1:5433,host2:5434" в список [(host, port), ...]."""
+    replicas = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        replicas.append((host, port or None))
+    return replicas
+
+
+class Replica:
+    """Соединение с одной репликой только для чтения и её состояние здоровья."""
+
+    def __init__(self, host: str, port):
+        self.host = host
+        self.port = port
+        self.conn = None
+        self.health_conn = None  # отдельное соединение для проверок, чтобы не мешать чтениям
+        self.down_until = 0.0  # до этого момента (time.monotonic) реплика не используется
+        # Позиция WAL, применённая репликой на момент последней успешной проверки.
+        # Пока реплика ни разу не проверена (None), она в балансировке не участвует.
+        self.replay_lsn = None
+
+    def __str__(self):
+        return f"{self.host}:{self.port}"
+
+    def mark_down(self, retry_interval: float, reason):
+        # Соединения здесь не закрываем: mark_down вызывается и из фоновой проверки, и из обработчиков,
+        # и каждый закрывает только своё соединение (health_conn или conn), чтобы не оборвать чужой запрос
+        self.down_until = time.monotonic() + retry_interval
+        self.replay_lsn = None
+        print(f"Реплика {self} исключена из балансировки на {retry_interval:.0f} с: {reason}")
+
+    def close(self):
+        for conn in (self.conn, self.health_conn):
+            if conn and not conn.closed:
+                conn.close()
+
+
 class DBManager:
-    def __init__(self):
+    """
+    Запросы на запись выполняются на primary (DB_HOST/DB_PORT), а запросы только для чтения
+    распределяются по кругу между репликами (DB_REPLICAS). Если реплик нет или все они
+    недоступны, чтение идёт на primary.
+    Состояние реплик обновляет check_replicas_health, которую нужно периодически вызывать
+    в фоне (раз в health_check_interval секунд), а не из обработчиков запросов.
+    """
+
+    def __init__(self, replicas: list = None, replica_max_lag: float = None, health_check_interval: float = None):
         self.db_host = os.getenv("DB_HOST")
         self.db_port = os.getenv("DB_PORT")
         self.db_name = os.getenv("DB_NAME")
         self.db_user = os.getenv("DB_USER")
         self.db_password = os.getenv("DB_PASSWORD")
         self.conn = None
+        self._health_conn = None  # отдельное соединение с primary для проверок реплик
+
+        if replicas is None:
+            replicas = parse_replicas(os.getenv("DB_REPLICAS"))
+        self.replicas = [Replica(host, port) for host, port in replicas]
+        # Реплика, отстающая больше чем на replica_max_lag секунд, считается нездоровой
+        # (с точностью до health_check_interval: позиция primary запоминается при каждой проверке)
+        self.replica_max_lag = replica_max_lag if replica_max_lag is not None \
+            else float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+        self.health_check_interval = health_check_interval if health_check_interval is not None \
+            else float(os.getenv("DB_REPLICA_HEALTH_CHECK_INTERVAL", "10"))
+        self._next_replica = 0
+        self._primary_lsn_samples = deque()  # [(time.monotonic(), позиция WAL primary), ...]
+        # Read-your-writes: ключи с записями, позиция WAL для которых ещё не получена,
+        # и позиции WAL primary, которые реплика должна применить, чтобы читать по ключу.
+        self._pending_write_keys = set()
+        self._write_lsn = {}
+        self._write_lock = threading.Lock()
+
+    def _open_connection(self, host=None, port=None, **kwargs) -> PgConnection:
+        return psycopg2.connect(
+            host=host or self.db_host,
+            port=port or self.db_port,
+            dbname=self.db_name,
+            user=self.db_user,
+            password=self.db_password,
+            **kwargs
+        )
 
     def connect(self) -> PgConnection:
         if self.conn is None or self.conn.closed:
             try:
-                self.conn = psycopg2.connect(
-                    host=self.db_host,
-                    port=self.db_port,
-                    dbname=self.db_name,
-                    user=self.db_user,
-                    password=self.db_password
-                )
+                self.conn = self._open_connection()
                 self.conn.autocommit = True
                 print("Успешное подключение к базе данных PostgreSQL.")
             except psycopg2.Error as e:
@@ -31,25 +121,212 @@ class DBManager:
         return self.conn
 
     def close(self):
+        for replica in self.replicas:
+            replica.close()
+        if self._health_conn and not self._health_conn.closed:
+            self._health_conn.close()
         if self.conn and not self.conn.closed:
             self.conn.close()
             print("Соединение с базой данных закрыто.")
 
-    def _execute_query(self, query: sql.Composable, params=None, fetch_one=False, fetch_all=False):
+    def _open_replica_connection(self, replica: Replica):
+        try:
+            # Короткий таймаут, чтобы недоступная реплика не задерживала обработку запросов
+            conn = self._open_connection(replica.host, replica.port, connect_timeout=3)
+            conn.set_session(readonly=True, autocommit=True)
+            return conn
+        except psycopg2.Error as e:
+            replica.mark_down(self.health_check_interval, e)
+            return None
+
+    def _connect_replica(self, replica: Replica):
+        if replica.conn is None or replica.conn.closed:
+            replica.conn = self._open_replica_connection(replica)
+        return replica.conn
+
+    def _primary_wal_lsn(self):
+        """Текущая позиция WAL на primary (строка вида '0/3000148') или None, если primary недоступен."""
+        try:
+            if self._health_conn is None or self._health_conn.closed:
+                self._health_conn = self._open_connection(connect_timeout=3)
+                self._health_conn.autocommit = True
+            with self._health_conn.cursor() as cur:
+                cur.execute("SELECT pg_current_wal_lsn()::text;")
+                return cur.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"Не удалось получить позицию WAL на primary: {e}")
+            if self._health_conn and not self._health_conn.closed:
+                self._health_conn.close()
+            self._health_conn = None
+            return None
+
+    def check_replicas_health(self):
+        """
+        Проверяет доступность и отставание реплик, нездоровые временно исключаются из балансировки.
+        Функция блокирующая (подключение к недоступной реплике ждёт до connect_timeout),
+        поэтому из бота её нужно вызывать в фоне через asyncio.to_thread.
+        """
+        # Ключи, записанные до запроса позиции primary, получают эту позицию: так отметки о записях
+        # не копятся, даже если по ключу больше никто не читает (см. очистку _write_lsn ниже)
+        with self._write_lock:
+            pending_keys = self._pending_write_keys
+            self._pending_write_keys = set()
+        primary_lsn = self._primary_wal_lsn()
+        with self._write_lock:
+            if primary_lsn is None:
+                self._pending_write_keys |= pending_keys
+            else:
+                for key in pending_keys:
+                    self._write_lsn[key] = max(self._write_lsn.get(key, 0), lsn_to_int(primary_lsn))
+        required_lsn = self._lagged_primary_lsn(primary_lsn)
+
+        for replica in self.replicas:
+            if time.monotonic() < replica.down_until:
+                continue
+            if replica.health_conn is None or replica.health_conn.closed:
+                replica.health_conn = self._open_replica_connection(replica)
+            if not replica.health_conn:
+                continue
+            try:
+                with replica.health_conn.cursor() as cur:
+                    cur.execute(REPLICA_STATUS_QUERY)
+                    in_recovery, replay_lsn = cur.fetchone()
+            except psycopg2.Error as e:
+                replica.health_conn.close()
+                replica.health_conn = None
+                replica.mark_down(self.health_check_interval, e)
+                continue
+            if not in_recovery or replay_lsn is None:
+                replica.mark_down(self.health_check_interval, "сервер не является репликой")
+            elif required_lsn is not None and lsn_to_int(replay_lsn) < required_lsn:
+                replica.mark_down(
+                    self.health_check_interval,
+                    f"не применено WAL, записанное на primary более {self.replica_max_lag:g} с назад"
+                )
+            else:
+                replica.replay_lsn = lsn_to_int(replay_lsn)
+
+        # Заодно забываем ключи read-your-writes, которые точно есть на любой реплике из балансировки:
+        # не дальше required_lsn (без него реплику не пустит проверка) или уже применённые всеми репликами
+        replayed = [replica.replay_lsn for replica in self.replicas]
+        forget_up_to = max(required_lsn or 0, min(replayed) if None not in replayed else 0)
+        with self._write_lock:
+            for key, lsn in list(self._write_lsn.items()):
+                if lsn <= forget_up_to:
+                    del self._write_lsn[key]
+
+    def _lagged_primary_lsn(self, primary_lsn):
+        """
+        Запоминает текущую позицию primary и возвращает позицию, которую primary имел не меньше
+        replica_max_lag секунд назад (None, если таких замеров ещё нет): реплика, не дошедшая до неё,
+        отстаёт больше допустимого. Запись, идущая в момент проверки, на оценку не влияет.
+        """
+        now = time.monotonic()
+        samples = self._primary_lsn_samples
+        if primary_lsn is not None:
+            samples.append((now, lsn_to_int(primary_lsn)))
+        while len(samples) > 1 and now - samples[1][0] >= self.replica_max_lag:
+            samples.popleft()
+        if samples and now - samples[0][0] >= self.replica_max_lag:
+            return samples[0][1]
+        return None
+
+    def _mark_write(self, key):
+        # Без реплик все чтения идут на primary, и отслеживать записи незачем
+        if key is not None and self.replicas:
+            with self._write_lock:
+                self._pending_write_keys.add(key)
+
+    def _required_lsn(self, key):
+        """
+        Позиция WAL, которую должна применить реплика, чтобы чтение по ключу увидело все его записи;
+        0 — подойдёт любая реплика, None — читать только с primary.
+        Позицию primary запрашиваем лениво, при первом чтении после записей, а не после каждой записи:
+        она не меньше позиции всех уже подтверждённых записей по этому ключу.
+        """
+        if key is None:
+            return 0
+        with self._write_lock:
+            pending = key in self._pending_write_keys
+            # Снимаем отметку до запроса позиции: запись, сделанная после этого, поставит её снова
+            self._pending_write_keys.discard(key)
+        if pending:
+            row = self._execute_query(sql.SQL("SELECT pg_current_wal_lsn()::text;"), fetch_one=True)
+            if not row:
+                with self._write_lock:
+                    self._pending_write_keys.add(key)
+                return None
+            with self._write_lock:
+                self._write_lsn[key] = max(self._write_lsn.get(key, 0), lsn_to_int(row[0]))
+        with self._write_lock:
+            return self._write_lsn.get(key, 0)
+
+    def _replicas_for_read(self, key=None) -> list:
+        """Возвращает реплики для чтения в порядке round-robin (пустой список — читать с primary)."""
+        if not self.replicas:
+            return []
+        required_lsn = self._required_lsn(key)
+        if required_lsn is None:
+            return []
+        start = self._next_replica
+        self._next_replica = (start + 1) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        # replay_lsn обновляется только при проверках и может лишь отставать от реального,
+        # так что сравнение с ним не пропустит реплику, ещё не применившую нужные записи.
+        # Фоновая проверка может сбросить replay_lsn в None в любой момент, поэтому читаем его один раз.
+        available = []
+        now = time.monotonic()
+        for replica in ordered:
+            replay_lsn = replica.replay_lsn
+            if replay_lsn is not None and now >= replica.down_until and replay_lsn >= required_lsn:
+                available.append(replica)
+        return available
+
+    @staticmethod
+    def _run_query(conn: PgConnection, query, params, fetch_one, fetch_all):
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            if fetch_one:
+                return cur.fetchone()
+            if fetch_all:
+                return cur.fetchall()
+
+    def _execute_query(self, query: sql.Composable, params=None, fetch_one=False, fetch_all=False,
+                       read_only=False, consistency_key=None):
+        """
+        read_only=True разрешает выполнить запрос на реплике.
+        consistency_key — ключ read-your-writes (например, CATALOG_WRITE_KEY):
+        для запроса на запись успешное выполнение запоминается, а чтение по этому ключу
+        идёт только на реплики, уже применившие эту запись, иначе на primary.
+        """
+        if read_only:
+            for replica in self._replicas_for_read(consistency_key):
+                conn = self._connect_replica(replica)
+                if not conn:
+                    continue
+                try:
+                    return self._run_query(conn, query, params, fetch_one, fetch_all)
+                except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                    # Проблема с соединением — пробуем следующую реплику или primary
+                    conn.close()
+                    replica.conn = None
+                    replica.mark_down(self.health_check_interval, e)
+                except psycopg2.Error as e:
+                    print(f"Ошибка при выполнении запроса на реплике {replica}: {e}")
+                    return None
+
         conn = self.connect()
         if not conn:
             return None
 
         try:
-            with conn.cursor() as cur:
-                cur.execute(query, params)
-                if fetch_one:
-                    return cur.fetchone()
-                if fetch_all:
-                    return cur.fetchall()
+            result = self._run_query(conn, query, params, fetch_one, fetch_all)
         except psycopg2.Error as e:
             print(f"Ошибка при выполнении запроса: {e}")
             return None
+        if not read_only:
+            self._mark_write(consistency_key)
+        return result
 
     def initialize_db_schema(self, sql_script_path: str):
         conn = self.connect()
@@ -67,88 +344,141 @@ class DBManager:
         except psycopg2.Error as e:
             print(f"Ошибка при инициализации схемы БД: {e}")
 
-    def load_factors_from_json(self, json_path: str):
-        conn = self.connect()
-        if not conn:
-            return
-
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                factors_data = json.load(f)
+    @staticmethod
+    def _sync_catalog_table(cur, table: str, columns: tuple, current: dict, target: dict):
+        """
+        Приводит таблицу каталога (id, name, ...columns) к target = {id: (name, ...)}, зная её
+        текущее содержимое current в том же формате. Меняются только отличающиеся строки.
+        """
+        table_sql = sql.Identifier(table)
+        all_columns = ("name",) + columns
+        removed = [i for i in current if i not in target]
+        changed = [i for i in target if i in current and current[i] != target[i]]
+        added = [i for i in target if i not in current]
 
-            with conn.cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM factors;")
-                if cur.fetchone()[0] > 0:
-                    print("Таблица 'factors' уже содержит данные. Пропуск загрузки.")
-                    # Если данные уже есть, но нужно обновить вопрос, можно добавить логику UPDATE
-                    # Но пока что оставим так, чтобы не дублировать.
-                    # Если ты изменил question_text в JSON и хочешь обновить БД,
-                    # тебе нужно будет очистить таблицу factors и перезапустить бота.
-                    return
-
-                for factor in factors_data:
-                    # Изменяем запрос:
-                    query = sql.SQL(
-                        "INSERT INTO factors (id, name, question_text) VALUES (%s, %s, %s) ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, question_text = EXCLUDED.question_text;")
-                    self._execute_query(query, (factor['id'], factor['name'], factor['question_text']))
-                print(f"Факторы успешно загружены из {json_path}")
-        except FileNotFoundError:
-            print(f"Ошибка: Файл факторов '{json_path}' не найден.")
-        except json.JSONDecodeError:
-            print(f"Ошибка: Некорректный формат JSON-файла '{json_path}'.")
-        except Exception as e:
-            print(f"Неизвестная ошибка при загрузке факторов: {e}")
+        if removed:
+            cur.execute(sql.SQL("DELETE FROM {} WHERE id = ANY(%s);").format(table_sql), (removed,))
 
-    def load_income_methods_from_json(self, json_path: str):
-        conn = self.connect()
-        if not conn:
-            return
+        # UNIQUE(name) проверяется построчно и не откладывается до конца транзакции,
+        # поэтому имя, переходящее к другому id (перенумерация, обмен имён), сначала
+        # освобождаем временным значением, и только потом записываем новые имена.
+        renamed = [i for i in changed if current[i][0] != target[i][0]]
+        if renamed:
+            cur.execute(
+                sql.SQL("UPDATE {} SET name = '__catalog_reload__' || id::text WHERE id = ANY(%s);").format(table_sql),
+                (renamed,)
+            )
+        if changed:
+            execute_values(
+                cur,
+                sql.SQL("UPDATE {table} AS t SET {assignments} FROM (VALUES %s) AS v(id, {columns}) WHERE t.id = v.id;").format(
+                    table=table_sql,
+                    assignments=sql.SQL(", ").join(
+                        sql.SQL("{0} = v.{0}").format(sql.Identifier(c)) for c in all_columns
+                    ),
+                    columns=sql.SQL(", ").join(map(sql.Identifier, all_columns)),
+                ).as_string(cur),
+                [(i,) + target[i] for i in changed]
+            )
+        if added:
+            execute_values(
+                cur,
+                sql.SQL("INSERT INTO {table} (id, {columns}) VALUES %s;").format(
+                    table=table_sql,
+                    columns=sql.SQL(", ").join(map(sql.Identifier, all_columns)),
+                ).as_string(cur),
+                [(i,) + target[i] for i in added]
+            )
+        return removed
 
+    def sync_catalog(self, factors_data: list, methods_data: list):
+        """
+        Приводит таблицы factors, income_methods и method_factor_scores в соответствие
+        с проверенными данными каталога (см. catalog.read_catalog_files).
+        Выполняется одной транзакцией на отдельном соединении, чтобы не мешать
+        запросам бота на основном соединении и не оставлять каталог в промежуточном состоянии.
+        Изменяются только отличающиеся строки: ON CONFLICT DO UPDATE или полная перезапись
+        заблокировали бы все строки factors, и сохранение ответов пользователей (внешний ключ
+        на factors) ждало бы окончания синхронизации.
+        При ошибке транзакция откатывается, а исключение пробрасывается вызывающему коду.
+        """
+        conn = self._open_connection()
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                methods_data = json.load(f)
+            with conn:  # commit при успехе, rollback при исключении
+                with conn.cursor() as cur:
+                    cur.execute("SELECT id, name, question_text FROM factors;")
+                    current_factors = {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+                    cur.execute("SELECT id, name, description FROM income_methods;")
+                    current_methods = {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+                    cur.execute("SELECT method_id, factor_id, score FROM method_factor_scores;")
+                    current_scores = {(row[0], row[1]): row[2] for row in cur.fetchall()}
 
-            with conn.cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM income_methods;")
-                if cur.fetchone()[0] > 0:
-                    print("Таблицы 'income_methods' и 'method_factor_scores' уже содержат данные. Пропуск загрузки.")
-                    return
-
-                for method in methods_data:
-                    insert_method_query = sql.SQL(
-                        "INSERT INTO income_methods (id, name, description) VALUES (%s, %s, %s) ON CONFLICT (id) DO NOTHING RETURNING id;"
-                    )
-                    cur.execute(insert_method_query, (method['id'], method['name'], method['description']))
-                    method_id = cur.fetchone()[0]
-
-                    for factor_name, score in method['factors'].items():
-                        get_factor_id_query = sql.SQL("SELECT id FROM factors WHERE name = %s;")
-                        cur.execute(get_factor_id_query, (factor_name,))
-                        factor_row = cur.fetchone()
-                        if factor_row:
-                            factor_id = factor_row[0]
-                            insert_score_query = sql.SQL(
-                                "INSERT INTO method_factor_scores (method_id, factor_id, score) VALUES (%s, %s, %s);"
-                            )
-                            cur.execute(insert_score_query, (method_id, factor_id, score))
-                        else:
-                            print(f"Предупреждение: Фактор '{factor_name}' не найден в БД для метода '{method['name']}'.")
-                print(f"Способы увеличения дохода и их факторы успешно загружены из {json_path}")
-        except FileNotFoundError:
-            print(f"Ошибка: Файл методов '{json_path}' не найден.")
-        except json.JSONDecodeError:
-            print(f"Ошибка: Некорректный формат JSON-файла '{json_path}'.")
-        except Exception as e:
-            print(f"Неизвестная ошибка при загрузке способов: {e}")
+                    factor_name_to_id = {f['name']: f['id'] for f in factors_data}
+                    target_scores = {
+                        (m['id'], factor_name_to_id[factor_name]): score
+                        for m in methods_data
+                        for factor_name, score in m['factors'].items()
+                    }
+
+                    # Сначала способы: их удаление освобождает оценки до изменения факторов
+                    removed_methods = set(self._sync_catalog_table(
+                        cur, "income_methods", ("description",), current_methods,
+                        {m['id']: (m['name'], m['description']) for m in methods_data}
+                    ))
+                    removed_factors = set(self._sync_catalog_table(
+                        cur, "factors", ("question_text",), current_factors,
+                        {f['id']: (f['name'], f['question_text']) for f in factors_data}
+                    ))
+
+                    # Оценки удалённых способов и факторов уже удалены каскадно
+                    current_scores = {
+                        key: score for key, score in current_scores.items()
+                        if key[0] not in removed_methods and key[1] not in removed_factors
+                    }
+                    removed_scores = [key for key in current_scores if key not in target_scores]
+                    changed_scores = [
+                        key + (score,) for key, score in target_scores.items()
+                        if key in current_scores and current_scores[key] != score
+                    ]
+                    added_scores = [key + (score,) for key, score in target_scores.items() if key not in current_scores]
+                    if removed_scores:
+                        execute_values(
+                            cur,
+                            "DELETE FROM method_factor_scores AS s USING (VALUES %s) AS v(method_id, factor_id) "
+                            "WHERE s.method_id = v.method_id AND s.factor_id = v.factor_id;",
+                            removed_scores
+                        )
+                    if changed_scores:
+                        execute_values(
+                            cur,
+                            "UPDATE method_factor_scores AS s SET score = v.score "
+                            "FROM (VALUES %s) AS v(method_id, factor_id, score) "
+                            "WHERE s.method_id = v.method_id AND s.factor_id = v.factor_id;",
+                            changed_scores
+                        )
+                    if added_scores:
+                        execute_values(
+                            cur,
+                            "INSERT INTO method_factor_scores (method_id, factor_id, score) VALUES %s;",
+                            added_scores
+                        )
+            self._mark_write(CATALOG_WRITE_KEY)
+            print(f"Каталог синхронизирован с БД: факторов {len(factors_data)}, способов {len(methods_data)}; "
+                  f"изменено оценок: {len(removed_scores) + len(changed_scores) + len(added_scores)}.")
+        finally:
+            conn.close()
 
     def get_all_factors(self):
         """Получает все факторы из базы данных, включая текст вопроса."""
         # Изменяем запрос, чтобы выбрать также question_text
         query = sql.SQL("SELECT id, name, question_text FROM factors ORDER BY id;")
-        return self._execute_query(query, fetch_all=True)
+        return self._execute_query(query, fetch_all=True, read_only=True, consistency_key=CATALOG_WRITE_KEY)
 
     def get_user_preferences(self, user_id: int) -> dict:
-        """Получает предпочтения пользователя по факторам в виде словаря {factor_id: preference_score}."""
+        """
+        Получает предпочтения пользователя по факторам в виде словаря {factor_id: preference_score}.
+        Читает с primary: ответы пользователя обычно нужны сразу после их сохранения.
+        """
         query = sql.SQL("SELECT factor_id, preference_score FROM user_factor_preferences WHERE user_id = %s;")
         preferences = self._execute_query(query, (user_id,), fetch_all=True)
         return {p[0]: p[1] for p in preferences} if preferences else {}
@@ -195,7 +525,7 @@ class DBManager:
                 im.id, f.id;
             """
         )
-        raw_data = self._execute_query(query, fetch_all=True)
+        raw_data = self._execute_query(query, fetch_all=True, read_only=True, consistency_key=CATALOG_WRITE_KEY)
 
         if not raw_data:
             return []
@@ -239,7 +569,8 @@ class DBManager:
                 f.id; -- Сортируем по ID фактора для последовательности
             """
         )
-        raw_data = self._execute_query(query, (method_id,), fetch_all=True)
+        raw_data = self._execute_query(query, (method_id,), fetch_all=True, read_only=True,
+                                       consistency_key=CATALOG_WRITE_KEY)
 
         if not raw_data:
             return None
@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 
 import telegram
 from dotenv import load_dotenv
@@ -13,6 +14,7 @@ from telegram.ext import (
 )
 
 from db_manager import DBManager  # Убедись, что этот импорт правильный
+from catalog import CatalogManager
 
 load_dotenv()
 
@@ -24,8 +26,15 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 FACTORS_JSON_PATH = os.getenv("FACTORS_JSON_PATH")
 INCOME_METHODS_JSON_PATH = os.getenv("INCOME_METHODS_JSON_PATH")
+# Telegram ID администраторов через запятую, им доступна команда /reload_catalog
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()}
+# Период проверки изменений JSON-файлов каталога в секундах (0 — не следить за файлами)
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "0"))
+# Сколько похожих способов показывать в подробностях способа
+SIMILAR_METHODS_COUNT = int(os.getenv("SIMILAR_METHODS_COUNT", "3"))
 
 db_manager = DBManager()
+catalog_manager = CatalogManager(db_manager, FACTORS_JSON_PATH, INCOME_METHODS_JSON_PATH, SIMILAR_METHODS_COUNT)
 
 ASKING_FACTORS = 0
 SHOWING_RECOMMENDATIONS = 1  # Новое состояние для отображения рекомендаций
@@ -50,6 +59,9 @@ START_SURVEY_BUTTON = [
     [InlineKeyboardButton("Начать тест", callback_data="start_survey_btn")]
 ]
 
+# Сколько строк ошибки перезагрузки каталога показывать администратору
+RELOAD_ERROR_LINES = 15
+
 # Константа для эмодзи звезд
 STAR_EMOJI = "⭐️"
 EMPTY_STAR_EMOJI = "▪️" # Можно использовать другую эмодзи или просто пробел
@@ -63,6 +75,12 @@ def score_to_stars(score: int) -> str:
     return STAR_EMOJI * filled_stars + EMPTY_STAR_EMOJI * empty_stars
 
 
+def clear_survey_data(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Удаляет из user_data состояние завершённого опроса."""
+    for key in ("catalog_version", "factors", "current_factor_index", "user_preferences_temp"):
+        context.user_data.pop(key, None)
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик команды /start."""
     user = update.effective_user
@@ -115,12 +133,16 @@ async def start_survey(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     user_id = update.effective_user.id
     db_manager.add_user_if_not_exists(user_id)
 
-    factors = db_manager.get_all_factors()
-    if not factors:
+    # Опрос целиком проходит на снимке каталога, актуальном на момент старта,
+    # даже если во время опроса каталог будет перезагружен.
+    catalog = catalog_manager.current
+    if not catalog or not catalog.factors:
         await update.effective_chat.send_message("Извините, не могу загрузить факторы для опроса. Попробуйте позже.")
         return ConversationHandler.END
 
-    context.user_data["factors"] = factors
+    # Храним только номер версии: сами снимки держит catalog_manager
+    context.user_data["catalog_version"] = catalog.version
+    context.user_data["factors"] = catalog.factors
     context.user_data["current_factor_index"] = 0
     context.user_data["user_preferences_temp"] = {}
 
@@ -228,21 +250,27 @@ async def finish_survey(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         except Exception as e:
             print(f"Не удалось удалить старое сообщение с деталями перед выводом рекомендаций: {e}")
 
-    user_id = update.effective_user.id
-    user_preferences = db_manager.get_user_preferences(user_id)
+    # Считаем по ответам этого опроса: они привязаны к id факторов того снимка каталога,
+    # на котором опрос начался, и не зависят от того, успела ли запись в БД
+    # (фактор мог быть удалён перезагрузкой каталога во время опроса).
+    user_preferences = context.user_data.get("user_preferences_temp")
 
     if not user_preferences:
         await update.effective_chat.send_message("Не удалось получить ваши предпочтения. Пожалуйста, пройдите опрос снова.")
+        clear_survey_data(context)
         return ConversationHandler.END
 
-    all_methods = db_manager.get_all_methods_with_factors()
+    catalog = catalog_manager.get(context.user_data.get("catalog_version"))
+    all_methods = catalog.methods if catalog else []
 
     if not all_methods:
         await update.effective_chat.send_message("Не удалось загрузить способы увеличения дохода. Попробуйте позже.")
+        clear_survey_data(context)
         return ConversationHandler.END
 
-    all_db_factors = db_manager.get_all_factors()
-    factor_name_to_id = {name: fid for fid, name, _ in all_db_factors}
+    # Соответствие имён и id берём из вопросов опроса, а не из каталога: если снимок опроса
+    # уже вытеснен, способы оцениваются по текущему каталогу, но ответы остаются прежними.
+    factor_name_to_id = {name: fid for fid, name, _ in context.user_data["factors"]}
 
     scored_methods = []
     for method in all_methods:
@@ -277,6 +305,7 @@ async def finish_survey(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         return SHOWING_RECOMMENDATIONS
     else:
         await update.effective_chat.send_message("Не удалось найти подходящие рекомендации.")
+        clear_survey_data(context)
         return ConversationHandler.END
 
 
@@ -311,7 +340,9 @@ async def show_method_details(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
 
     method_id = int(query.data.replace("show_method_", ""))
-    method_details = db_manager.get_method_details(method_id)
+    # Детали берём из того же снимка каталога, по которому строились рекомендации
+    catalog = catalog_manager.get(context.user_data.get("catalog_version"))
+    method_details = catalog.methods_by_id.get(method_id) if catalog else None
 
     if not method_details:
         await query.message.reply_text("Извините, не удалось найти информацию об этом способе.")
@@ -323,7 +354,7 @@ async def show_method_details(update: Update, context: ContextTypes.DEFAULT_TYPE
         "**Характеристики:**\n"
     )
 
-    all_factors_ordered = db_manager.get_all_factors()
+    all_factors_ordered = catalog.factors
     method_factor_scores_dict = method_details['factors']
 
     for factor_id, factor_name, _ in all_factors_ordered:
@@ -334,10 +365,15 @@ async def show_method_details(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     message_text += "\nВы можете выбрать другой способ из списка выше или начать новый опрос: /survey"
 
-    # Кнопки для сообщения с деталями
-    details_markup = InlineKeyboardMarkup([
-        [InlineKeyboardButton("Закрыть", callback_data="close_details")]
-    ])
+    # Кнопки для сообщения с деталями: похожие способы (из предрассчитанного индекса) и "Закрыть"
+    details_buttons = []
+    similar_methods = catalog.get_similar_methods(method_id)
+    if similar_methods:
+        message_text += "\n\n**Похожие способы:**"
+        for similar in similar_methods:
+            details_buttons.append([InlineKeyboardButton(similar['name'], callback_data=f"show_method_{similar['id']}")])
+    details_buttons.append([InlineKeyboardButton("Закрыть", callback_data="close_details")])
+    details_markup = InlineKeyboardMarkup(details_buttons)
 
     # Логика редактирования/отправки сообщения с деталями
     if "details_message_id" in context.user_data:
@@ -404,18 +440,78 @@ async def close_details(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 
 
 async def cancel_survey(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    clear_survey_data(context)
     await update.message.reply_text("Опрос отменен. Вы можете начать его снова командой /survey.")
     return ConversationHandler.END
 
 
+async def reload_catalog(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обработчик команды /reload_catalog (только для администраторов)."""
+    if update.effective_user.id not in ADMIN_IDS:
+        return
+
+    try:
+        catalog = await catalog_manager.reload()
+    except Exception as e:
+        print(f"Ошибка перезагрузки каталога: {e}")
+        # Ошибок проверки большого файла могут быть тысячи, а Telegram не примет сообщение длиннее 4096 символов
+        error_lines = str(e).splitlines()
+        error_text = "\n".join(line[:200] for line in error_lines[:RELOAD_ERROR_LINES])
+        if len(error_lines) > RELOAD_ERROR_LINES:
+            error_text += f"\n... и ещё ошибок: {len(error_lines) - RELOAD_ERROR_LINES}"
+        await update.message.reply_text(f"Каталог не перезагружен, используется прежняя версия.\n{error_text}")
+        return
+
+    await update.message.reply_text(
+        f"Каталог перезагружен (версия {catalog.version}): "
+        f"факторов {len(catalog.factors)}, способов {len(catalog.methods)}. "
+        "Начатые опросы завершатся на прежней версии."
+    )
+
+
+async def check_replicas_periodically() -> None:
+    """Фоновая проверка реплик: в рабочем потоке, чтобы недоступная реплика не останавливала бота."""
+    while True:
+        await asyncio.sleep(db_manager.health_check_interval)
+        try:
+            await asyncio.to_thread(db_manager.check_replicas_health)
+        except Exception as e:
+            print(f"Ошибка проверки реплик: {e}")
+
+
+async def post_init(application: Application) -> None:
+    if CATALOG_WATCH_INTERVAL > 0:
+        application.bot_data["catalog_watch_task"] = asyncio.create_task(
+            catalog_manager.watch(CATALOG_WATCH_INTERVAL)
+        )
+    if db_manager.replicas:
+        application.bot_data["replica_health_task"] = asyncio.create_task(check_replicas_periodically())
+
+
+async def post_shutdown(application: Application) -> None:
+    for task_name in ("catalog_watch_task", "replica_health_task"):
+        task = application.bot_data.get(task_name)
+        if task:
+            task.cancel()
+
+
 def main() -> None:
     db_manager.initialize_db_schema("init_db.sql")
     data_dir = os.path.dirname(FACTORS_JSON_PATH)
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
-    db_manager.load_factors_from_json(FACTORS_JSON_PATH)
-    db_manager.load_income_methods_from_json(INCOME_METHODS_JSON_PATH)
-    application = Application.builder().token(BOT_TOKEN).build()
+    if db_manager.replicas:
+        # Первая проверка до запуска бота: непроверенные реплики в балансировке не участвуют
+        db_manager.check_replicas_health()
+    # Каталог из JSON-файлов применяется к БД при каждом старте, а не только в пустые таблицы
+    catalog_manager.load_initial()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     conv_handler = ConversationHandler(
         entry_points=[
@@ -441,6 +537,9 @@ def main() -> None:
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
+    # block=False: перезагрузка (проверка файлов, запись в БД, построение индекса) может идти десятки секунд,
+    # и всё это время бот должен продолжать обрабатывать обновления других пользователей
+    application.add_handler(CommandHandler("reload_catalog", reload_catalog, block=False))
     application.add_handler(conv_handler)
 
     print("Бот запущен...")
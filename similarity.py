@@ -0,0 +1,152 @@
+import numpy as np
+
+# Сколько строк матрицы сходства считается за раз: block x N float32.
+# Для каталога в 100 тыс. способов это ~50 МБ вместо 40 ГБ на всю матрицу.
+SIMILARITY_BLOCK_SIZE = 128
+# До такого k соседей выбираем повторными argmax, для больших k — через argpartition
+ARGMAX_MAX_K = 8
+
+
+def method_vector(method: dict, factor_names: tuple) -> list:
+    """Вектор оценок способа в порядке factor_names (отсутствующий фактор — 0)."""
+    return [method['factors'].get(name, 0) for name in factor_names]
+
+
+def _normalize(vectors, width: int) -> np.ndarray:
+    # Явная форма (а не reshape(-1, width)), чтобы пустой каталог или каталог без факторов
+    # давал пустую матрицу, а не ValueError
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), width)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # нулевой вектор так и останется нулевым (сходство 0 со всеми)
+    return vectors / norms
+
+
+def _top_k(vectors: np.ndarray, rows: np.ndarray, k: int):
+    """
+    Для строк rows находит k ближайших по косинусному сходству строк vectors (кроме самой строки).
+    Возвращает (neighbours, similarities) размера len(rows) x k, отсортированные по убыванию сходства;
+    недостающие соседи заполняются -1 / -inf.
+    """
+    n = len(vectors)
+    neighbours = np.full((len(rows), k), -1, dtype=np.int32)
+    similarities = np.full((len(rows), k), -np.inf, dtype=np.float32)
+    kk = min(k, n - 1)
+    if kk <= 0:
+        return neighbours, similarities
+
+    for start in range(0, len(rows), SIMILARITY_BLOCK_SIZE):
+        block = rows[start:start + SIMILARITY_BLOCK_SIZE]
+        sims = vectors[block] @ vectors.T
+        block_rows = np.arange(len(block))
+        sims[block_rows, block] = -np.inf
+        if kk <= ARGMAX_MAX_K:
+            # Несколько проходов argmax заметно быстрее argpartition по строке из N элементов
+            for j in range(kk):
+                best = sims.argmax(axis=1)
+                neighbours[start + block_rows, j] = best
+                similarities[start + block_rows, j] = sims[block_rows, best]
+                sims[block_rows, best] = -np.inf
+        else:
+            part = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+            part_sims = np.take_along_axis(sims, part, axis=1)
+            order = np.argsort(-part_sims, axis=1, kind='stable')
+            neighbours[start + block_rows, :kk] = np.take_along_axis(part, order, axis=1)
+            similarities[start + block_rows, :kk] = np.take_along_axis(part_sims, order, axis=1)
+    return neighbours, similarities
+
+
+class NeighbourIndex:
+    """
+    Индекс k ближайших способов по косинусному сходству векторов оценок факторов.
+    Строится один раз на версию каталога; поиск похожих способов — O(1).
+    Индекс не изменяется: with_method / without_method возвращают новый индекс,
+    поэтому снимки каталога у начатых опросов остаются согласованными.
+    """
+
+    def __init__(self, factor_names: tuple, k: int, ids: np.ndarray, vectors: np.ndarray,
+                 neighbours: np.ndarray, similarities: np.ndarray):
+        self.factor_names = factor_names
+        self.k = k
+        self._ids = ids
+        self._vectors = vectors
+        self._neighbours = neighbours
+        self._similarities = similarities
+        self._row_of = {int(method_id): row for row, method_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self._ids)
+
+    @classmethod
+    def build(cls, factor_names, methods: list, k: int) -> "NeighbourIndex":
+        factor_names = tuple(factor_names)
+        k = max(k, 0)  # k = 0 (SIMILAR_METHODS_COUNT=0) отключает похожие способы
+        ids = np.array([m['id'] for m in methods], dtype=np.int64)
+        vectors = _normalize([method_vector(m, factor_names) for m in methods], len(factor_names))
+        neighbours, similarities = _top_k(vectors, np.arange(len(ids)), k)
+        return cls(factor_names, k, ids, vectors, neighbours, similarities)
+
+    def similar(self, method_id: int) -> list:
+        """ID похожих способов, от самого похожего; пустой список, если способа нет в индексе."""
+        row = self._row_of.get(method_id)
+        if row is None:
+            return []
+        return [int(self._ids[i]) for i in self._neighbours[row] if i >= 0]
+
+    def with_method(self, method: dict) -> "NeighbourIndex":
+        """
+        Новый индекс с добавленным или изменённым способом.
+        Пересчитываются только строка самого способа и строки, где он был соседом;
+        остальным строкам он подставляется, если оказался ближе их худшего соседа.
+        """
+        ids, vectors = self._ids, self._vectors.copy()
+        neighbours, similarities = self._neighbours.copy(), self._similarities.copy()
+        vector = _normalize([method_vector(method, self.factor_names)], len(self.factor_names))[0]
+
+        row = self._row_of.get(method['id'])
+        if row is None:
+            row = len(ids)
+            ids = np.append(ids, method['id'])
+            vectors = np.vstack([vectors, vector])
+            neighbours = np.vstack([neighbours, np.full((1, self.k), -1, dtype=np.int32)])
+            similarities = np.vstack([similarities, np.full((1, self.k), -np.inf, dtype=np.float32)])
+        else:
+            vectors[row] = vector
+
+        # Строки, где способ уже был соседом, пересчитываем полностью: он мог из них выпасть
+        stale = np.flatnonzero((neighbours == row).any(axis=1))
+        stale = stale[stale != row]
+
+        sims = vectors @ vector
+        sims[row] = -np.inf
+        sims[stale] = -np.inf
+        # При k = 0 подставлять некуда: у индекса нет столбцов соседей
+        candidates = np.flatnonzero(sims > similarities[:, -1]) if self.k > 0 else []
+        if len(candidates):
+            neighbours[candidates, -1] = row
+            similarities[candidates, -1] = sims[candidates]
+            order = np.argsort(-similarities[candidates], axis=1, kind='stable')
+            neighbours[candidates] = np.take_along_axis(neighbours[candidates], order, axis=1)
+            similarities[candidates] = np.take_along_axis(similarities[candidates], order, axis=1)
+
+        recompute = np.append(stale, row)
+        neighbours[recompute], similarities[recompute] = _top_k(vectors, recompute, self.k)
+        return NeighbourIndex(self.factor_names, self.k, ids, vectors, neighbours, similarities)
+
+    def without_method(self, method_id: int) -> "NeighbourIndex":
+        """Новый индекс без указанного способа; пересчитываются только строки, где он был соседом."""
+        row = self._row_of.get(method_id)
+        if row is None:
+            return self
+
+        stale = (self._neighbours == row).any(axis=1)
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[row] = False
+        ids, vectors = self._ids[keep], self._vectors[keep]
+        neighbours, similarities = self._neighbours[keep], self._similarities[keep].copy()
+        # Номера строк после удаленной сдвигаются на одну вверх
+        neighbours = np.where(neighbours > row, neighbours - 1, neighbours).astype(np.int32)
+
+        recompute = np.flatnonzero(stale[keep])
+        if len(recompute):
+            neighbours[recompute], similarities[recompute] = _top_k(vectors, recompute, self.k)
+        return NeighbourIndex(self.factor_names, self.k, ids, vectors, neighbours, similarities)